@@ -0,0 +1,39 @@
+# Copyright 2016 Novo Nordisk Foundation Center for Biosustainability, DTU.
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+numba kernels behind driven.stats. Importing this module requires numba.
+"""
+
+from __future__ import absolute_import
+
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True)
+def _percentile_sorted(values, q):
+    # Linear interpolation between the closest ranks, as numpy.percentile does by default.
+    position = q / 100.0 * (values.shape[0] - 1)
+    lower = int(np.floor(position))
+    upper = min(lower + 1, values.shape[0] - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+@njit(cache=True)
+def iqr(sample):
+    values = np.sort(sample)
+    if np.isnan(values[-1]):
+        return np.nan
+    return _percentile_sorted(values, 75.0) - _percentile_sorted(values, 25.0)
@@ -16,7 +16,8 @@ from __future__ import absolute_import, print_function
 
 from itertools import combinations
 
-from numpy import ndarray
+from numpy import (
+    array, array_equal, asarray, asfortranarray, column_stack, fromiter, int8, intp, nanmedian, ndarray, where)
 from pandas import DataFrame, melt
 
 from driven.data_sets.normalization import or2min_and2max
@@ -67,10 +68,16 @@ class ExpressionProfile(object):
         data = DataFrame.from_csv(file_path, sep=sep)
         if replicas:
             columns = data.columns
-            data = DataFrame([data[columns[i:i+replicas]].median(axis=1) for i in
-                              range(0, len(columns), replicas)]).transpose()
-            data.columns = [get_common_start(*columns[i:i+replicas].tolist()) for i in
-                            range(0, len(columns), replicas)]
+            values = data.values
+            n_genes, n_columns = values.shape
+            complete = n_columns - n_columns % replicas
+            medians = nanmedian(values[:, :complete].reshape(n_genes, complete // replicas, replicas), axis=2)
+            if complete < n_columns:
+                # The last group has fewer replicas.
+                medians = column_stack((medians, nanmedian(values[:, complete:], axis=1)))
+            data = DataFrame(medians, index=data.index,
+                             columns=[get_common_start(*columns[i:i+replicas].tolist()) for i in
+                                      range(0, n_columns, replicas)])
         return cls.from_data_frame(data)
 
     @classmethod
@@ -102,18 +109,41 @@ class ExpressionProfile(object):
         identifiers = list(data_frame.index)
         return ExpressionProfile(identifiers, conditions, expression, p_values)
 
-    def __init__(self, identifiers, conditions, expression, p_values=None):
+    def __init__(self, identifiers, conditions, expression, p_values=None, dtype=None):
+        """
+        Parameters
+        ----------
+        identifiers: list
+            The gene or protein ids.
+        conditions: list
+            The conditions in the expression profile.
+        expression: numpy.ndarray
+            An 2 dimensional array (nxm) where n is the number of genes and m the number of conditions.
+        p_values: numpy.ndarray
+            The p-values between conditions (optional).
+        dtype: numpy.dtype
+            If given, expression and p_values are converted to it (e.g. numpy.float32 to halve the memory of large
+            profiles) and expression is stored column-major. By default the arrays are kept as given.
+        """
         assert isinstance(identifiers, list)
         assert isinstance(conditions, list)
         assert isinstance(expression, ndarray)
-        assert expression.shape == (len(identifiers), len(conditions))
+        if expression.shape != (len(identifiers), len(conditions)):
+            raise ValueError("Argument expression has shape %s (expected %s)" %
+                             (expression.shape, (len(identifiers), len(conditions))))
 
         self.conditions = conditions
         self._condition_index = dict((c, i) for i, c in enumerate(conditions))
         self.identifiers = identifiers
         self._gene_index = dict((g, i) for i, g in enumerate(identifiers))
+        if dtype is not None:
+            expression = asfortranarray(expression, dtype=dtype)
+            p_values = None if p_values is None else asarray(p_values, dtype=dtype)
         self.expression = expression
         self._p_values = p_values
+        self._reaction_dict_cache = dict()
+        self._reaction_genes_cache = (None, None)
+        self._p_value_columns = (None, None)
 
     def __getitem__(self, item):
         if not isinstance(item, tuple):
@@ -141,17 +171,13 @@ class ExpressionProfile(object):
     def __eq__(self, other):
         if not isinstance(other, ExpressionProfile):
             return False
-        else:
-            if self._p_values is None and other.p_values is None:
-                return self.identifiers == other.identifiers and \
-                       self.conditions == other.conditions and \
-                       self._p_values == other._p_values and \
-                       (self.expression == other.expression).all()
-            else:
-                return self.identifiers == other.identifiers and \
-                       self.conditions == other.conditions and \
-                       (self._p_values == other._p_values).all() and \
-                       (self.expression == other.expression).all()
+        if self.identifiers != other.identifiers or self.conditions != other.conditions:
+            return False
+        if not array_equal(self.expression, other.expression):
+            return False
+        if self._p_values is None or other._p_values is None:
+            return self._p_values is None and other._p_values is None
+        return array_equal(self._p_values, other._p_values)
 
     def _repr_html_(self):
         return self.data_frame._repr_html_()
@@ -167,7 +193,9 @@ class ExpressionProfile(object):
             A DataFrame
         """
         if self._p_values is None:
-            return DataFrame(self.expression,
+            # A Fortran-ordered copy keeps every condition contiguous in the frame; the plotting helpers read the
+            # frame one column at a time.
+            return DataFrame(self.expression.copy(order="F"),
                              index=self.identifiers,
                              columns=self.conditions)
 
@@ -185,7 +213,10 @@ class ExpressionProfile(object):
         list
             A list with p-value column headers.
         """
-        return ["%s %s p-value" % c for c in combinations(self.conditions, 2)]
+        conditions = tuple(self.conditions)
+        if self._p_value_columns[0] != conditions:
+            self._p_value_columns = (conditions, ["%s %s p-value" % c for c in combinations(conditions, 2)])
+        return list(self._p_value_columns[1])
 
     @property
     def p_values(self):
@@ -304,32 +335,119 @@ class ExpressionProfile(object):
             index = self._condition_index[condition]
         return dict(zip(self.identifiers, self.expression[:, index]))
 
+    def values_for(self, identifiers=None, condition=None):
+        """
+        Retrieves the expression values of several genes with a single gather.
+
+        Parameters
+        ----------
+        identifiers: list
+            The gene or protein ids (default: all of them).
+        condition: str or int
+            The condition or the index (default: all conditions).
+
+        Returns
+        -------
+        numpy.ndarray
+            A value per identifier, or a row per identifier when no condition is given.
+        """
+        if identifiers is None:
+            rows = slice(None)
+        else:
+            rows = fromiter((self._gene_index[identifier] for identifier in identifiers), dtype=intp)
+
+        if condition is None:
+            return self.expression[rows, :]
+        index = condition if isinstance(condition, int) else self._condition_index[condition]
+        return self.expression[rows, index]
+
     def to_reaction_dict(self, condition, model, cutoff, normalization=or2min_and2max):
-        gene_exp = self.to_dict(condition)
+        """
+        Builds a dict with reactions as keys and the expression value of their genes for the selected condition.
+
+        The result is cached on the profile. The cache key includes the expression values of the condition and the
+        gene-reaction rules of the model, so changes to either are picked up.
+
+        Parameters
+        ----------
+        condition: str or int
+            The condition or the index.
+        model: cobra.Model
+            The model with the reactions and their gene-reaction rules.
+        cutoff: number
+            The value used for genes that are not in the profile.
+        normalization: function
+            The function that combines the gene values of a reaction into a single value.
+
+        Returns
+        -------
+        dict
+        """
+        index = condition if isinstance(condition, int) else self._condition_index[condition]
+        rules = tuple((r.id, r.gene_reaction_rule) for r in model.reactions)
+        key = (index, cutoff, normalization, self.expression[:, index].tobytes(), rules)
+        try:
+            return dict(self._reaction_dict_cache[key])
+        except KeyError:
+            pass
+
+        positions, gene_ids, offsets, rows = self._reaction_genes(model, rules)
+        # One gather for the genes of all reactions; genes missing from the profile take the cutoff.
+        values = where(rows < 0, cutoff, self.expression[rows, index]).tolist()
         reaction_exp = {}
-        for r in model.reactions:
-            if len(r.genes) > 0 and any([identifier.id in self.identifiers for identifier in r.genes]):
-                reaction_exp[r.id] = normalization(r, {g.id: gene_exp.get(g.id, cutoff) for g in r.genes})
-        return reaction_exp
+        for position, ids, start, end in zip(positions, gene_ids, offsets[:-1], offsets[1:]):
+            reaction = model.reactions[position]
+            reaction_exp[reaction.id] = normalization(reaction, dict(zip(ids, values[start:end])))
+
+        if len(self._reaction_dict_cache) >= 16:
+            self._reaction_dict_cache.clear()
+        self._reaction_dict_cache[key] = reaction_exp
+        return dict(reaction_exp)
+
+    def _reaction_genes(self, model, rules):
+        """
+        Positions of the reactions with measured genes, their gene ids and the rows of those genes in expression.
+
+        The rows of all reactions are concatenated; offsets delimit each reaction and missing genes have row -1.
+        The result is kept for the last set of gene-reaction rules seen.
+        """
+        if self._reaction_genes_cache[0] == rules:
+            return self._reaction_genes_cache[1]
+
+        positions, gene_ids, offsets, rows = [], [], [0], []
+        gene_index = self._gene_index
+        for position, reaction in enumerate(model.reactions):
+            ids = [gene.id for gene in reaction.genes]
+            if any(gene_id in gene_index for gene_id in ids):
+                positions.append(position)
+                gene_ids.append(ids)
+                rows.extend(gene_index.get(gene_id, -1) for gene_id in ids)
+                offsets.append(len(rows))
+
+        result = positions, gene_ids, offsets, array(rows, dtype=intp)
+        self._reaction_genes_cache = (rules, result)
+        return result
 
     def differences(self, p_value=0.005):
-        diff = {}
-        for index, gene in enumerate(self.identifiers):
-            diff[gene] = []
-            for i in range(1, len(self.conditions)):
-                start, end = self.expression[index, i-1: i+1]
-                p = self.p_values[index, i-1]
-                if p <= p_value:
-                    if start < end:
-                        diff[gene].append(+1)
-                    elif start > end:
-                        diff[gene].append(-1)
-                    else:
-                        diff[gene].append(0)
-                else:
-                    diff[gene].append(0)
-
-        return diff
+        """
+        Direction of the change in expression between consecutive conditions.
+
+        Parameters
+        ----------
+        p_value: float
+            Changes with a p-value above this threshold are reported as 0. Without p-values every change counts.
+
+        Returns
+        -------
+        dict
+            The gene ids and, for each of them, a list with +1, -1 or 0 per pair of consecutive conditions.
+        """
+        start, end = self.expression[:, :-1], self.expression[:, 1:]
+        signs = (end > start).astype(int8) - (end < start).astype(int8)
+        if self._p_values is not None:
+            signs *= self._p_values[:, :signs.shape[1]] <= p_value
+
+        return {gene: row for gene, row in zip(self.identifiers, signs.tolist())}
 
     def minmax(self, condition=None):
         if condition is None:
@@ -340,7 +458,7 @@ class ExpressionProfile(object):
 
     def bin_width(self, condition=None, min_val=None, max_val=None):
         if condition is None:
-            values = self[:, :]
+            values = self[:, :].ravel()
         else:
             values = self[:, condition]
 
@@ -349,5 +467,4 @@ class ExpressionProfile(object):
         if max_val:
             values = values[values <= max_val]
 
-        values = values[:, condition]
         return freedman_diaconis(values)
@@ -14,7 +14,7 @@
 
 from __future__ import absolute_import, print_function
 
-from numpy import ndarray
+from numpy import column_stack, ndarray
 from pandas import DataFrame
 
 
@@ -28,9 +28,11 @@ class FluxConstraints(object):
     def from_data_frame(cls, data_frame, type="measurement"):
         reaction_ids = list(data_frame.index.values)
         if type == "measurement":
-            limits = data_frame.apply(lambda x: [x["value"]-x["deviation"], x["value"]+x["deviation"]], axis=1).values
+            value = data_frame["value"].values
+            deviation = data_frame["deviation"].values
+            limits = column_stack((value - deviation, value + deviation))
         elif type == "constraints":
-            limits = data_frame.apply(lambda x: [x["lower_limit"], x["upper_limit"]], axis=1).values
+            limits = data_frame[["lower_limit", "upper_limit"]].values
         else:
             raise ValueError("Invalid input type %s" % type)
 
@@ -14,15 +14,48 @@
 
 from __future__ import absolute_import, print_function
 
-from sympy import Add, Mul
-from sympy.functions.elementary.miscellaneous import Max, Min
+from ast import And, BoolOp, Name
 
 from cobra import Reaction
 
+try:
+    from cobra.core.gpr import GPR
+except ImportError:
+    # cobra < 0.25 parses rules into an ast.Expression.
+    from cobra.core.gene import parse_gpr
+
+    def _parse(rule):
+        tree, _ = parse_gpr(rule)
+        return None if tree is None else tree.body
+else:
+    def _parse(rule):
+        return GPR.from_string(rule).body
+
+# Parsed gene-reaction rules by rule string; the same rules are evaluated for every condition.
+_parsed_rules = {}
+
+
+def _parse_rule(rule):
+    try:
+        return _parsed_rules[rule]
+    except KeyError:
+        if len(_parsed_rules) >= 4096:
+            _parsed_rules.clear()
+        tree = _parsed_rules[rule] = _parse(rule)
+        return tree
+
+
+def _evaluate_gpr(node, gene_values):
+    if isinstance(node, Name):
+        return gene_values[node.id]
+    elif isinstance(node, BoolOp):
+        values = [_evaluate_gpr(value, gene_values) for value in node.values]
+        return min(values) if isinstance(node.op, And) else max(values)
+    else:
+        raise TypeError("Unsupported node %s in gene-reaction rule" % type(node).__name__)
+
 
 def or2min_and2max(reaction, gene_values):
     assert isinstance(reaction, Reaction)
     assert isinstance(gene_values, dict)
-    expression = reaction.gene_expression()
-    expression = expression.replace(Mul, Max).replace(Add, Min)
-    return expression.subs(gene_values).evalf()
+    return _evaluate_gpr(_parse_rule(reaction.gene_reaction_rule), gene_values)
@@ -0,0 +1,88 @@
+# Copyright 2016 Novo Nordisk Foundation Center for Biosustainability, DTU.
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Array kernels behind the per-reaction scores in driven.flux_analysis.results.
+
+The kernels are compiled with numba when it is installed and fall back to plain numpy otherwise.
+Missing values are represented as NaN, both in the inputs and in the outputs.
+inconsistency_scores returns the per-reaction scores together with their total.
+"""
+
+from __future__ import absolute_import, print_function
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+__all__ = ["inconsistency_scores", "activity", "fold_change", "MISSING_ACTIVITY"]
+
+# NaN marks missing data, so the 'nnan' and 'ninf' fast-math flags must stay off.
+_FASTMATH = {"nsz", "arcp", "contract", "afn", "reassoc"}
+
+# Activities are one of -1, 0 or 1 and are stored as int8; this value marks reactions inactive in both fluxes.
+MISSING_ACTIVITY = int(np.iinfo(np.int8).min)
+
+
+if njit is not None:
+    @njit(fastmath=_FASTMATH, cache=True)
+    def inconsistency_scores(fluxes, expression, cutoff):
+        scores = np.empty(fluxes.shape[0])
+        total = 0.0
+        for i in range(fluxes.shape[0]):
+            difference = cutoff - expression[i]
+            scores[i] = abs(fluxes[i]) * difference if difference > 0 else 0.0
+            total += scores[i]
+        return scores, total
+
+    @njit(fastmath=_FASTMATH, cache=True)
+    def activity(fluxes_a, fluxes_b, threshold):
+        result = np.empty(fluxes_a.shape[0], dtype=np.int8)
+        for i in range(fluxes_a.shape[0]):
+            value_a = abs(fluxes_a[i])
+            value_b = abs(fluxes_b[i])
+            if value_a < threshold and value_b < threshold:
+                result[i] = MISSING_ACTIVITY
+            else:
+                result[i] = (1 if value_a > threshold else 0) - (1 if value_b > threshold else 0)
+        return result
+
+    @njit(fastmath=_FASTMATH, cache=True)
+    def fold_change(fluxes_a, fluxes_b):
+        result = np.empty(fluxes_a.shape[0])
+        for i in range(fluxes_a.shape[0]):
+            if fluxes_a[i] > 0:
+                result[i] = (fluxes_a[i] - fluxes_b[i]) / fluxes_a[i]
+            else:
+                result[i] = np.nan
+        return result
+
+else:
+    def inconsistency_scores(fluxes, expression, cutoff):
+        scores = np.abs(fluxes) * np.fmax(cutoff - expression, 0)
+        return scores, float(scores.sum())
+
+    def activity(fluxes_a, fluxes_b, threshold):
+        value_a = np.abs(fluxes_a)
+        value_b = np.abs(fluxes_b)
+        result = (value_a > threshold).astype(np.int8) - (value_b > threshold).astype(np.int8)
+        result[(value_a < threshold) & (value_b < threshold)] = MISSING_ACTIVITY
+        return result
+
+    def fold_change(fluxes_a, fluxes_b):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(fluxes_a > 0, (fluxes_a - fluxes_b) / fluxes_a, np.nan)
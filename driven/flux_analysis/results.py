@@ -16,13 +16,15 @@ from __future__ import absolute_import, print_function
 
 from math import sqrt
 
-import six
-from numpy import nan, zeros
-from pandas import DataFrame
+from numpy import absolute, asarray, flatnonzero, float32, fromiter, isclose, isnan, nan, where
+from pandas import DataFrame, Series
 
 from cameo.core.result import Result
 from cameo.flux_analysis.simulation import FluxDistributionResult
 from cobra import Reaction
+from driven.flux_analysis._kernels import MISSING_ACTIVITY, activity, fold_change, inconsistency_scores
+
+__all__ = ["FluxBasedFluxDistribution", "ExpressionBasedResult", "GimmeResult", "IMATResult", "FluxDistributionDiff"]
 
 
 def _compare_flux_distributions(flux_dist1, flux_dist2, self_key="A", other_key="B"):
@@ -33,6 +35,27 @@ def _compare_flux_distributions(flux_dist1, flux_dist2, self_key="A", other_key=
 FluxDistributionResult.__sub__ = lambda self, other: _compare_flux_distributions(self, other)
 
 
+def _to_array(values, index, default=nan):
+    """
+    Gathers the values of a dict or pandas.Series for the keys in index into a float array.
+    Keys missing from values are filled with default.
+    """
+    if isinstance(values, Series):
+        return asarray(values.reindex(index, fill_value=default).values, dtype=float)
+    get = values.get
+    return fromiter((get(key, default) for key in index), dtype=float, count=len(index))
+
+
+def _split(values):
+    """
+    Returns the keys of a dict or pandas.Series as a list and its values as a float array, in one pass.
+    """
+    if isinstance(values, Series):
+        return list(values.index), asarray(values.values, dtype=float)
+    index = list(values.keys())
+    return index, fromiter(values.values(), dtype=float, count=len(index))
+
+
 class FluxBasedFluxDistribution(FluxDistributionResult):
     def __init__(self, fluxes, objective_value, c13_flux_distribution, *args, **kwargs):
         super(FluxBasedFluxDistribution, self).__init__(fluxes, objective_value, *args, **kwargs)
@@ -40,58 +63,109 @@ class FluxBasedFluxDistribution(FluxDistributionResult):
 
     @property
     def data_frame(self):
-        index = list(self.fluxes.keys())
-        data = zeros((len(self._fluxes.keys()), 3))
-        data[:, 0] = [self._fluxes[r] for r in index]
-        data[:, 1] = [self._c13_fluxes.get(r, [nan, nan])[0] for r in index]
-        data[:, 2] = [self._c13_fluxes.get(r, [nan, nan])[1] for r in index]
-        return DataFrame(data, index=index, columns=["fluxes", "c13_lower_limit", "c13_upper_limit"])
+        index, fluxes = _split(self._fluxes)
+        n = len(index)
+        data = {"fluxes": fluxes,
+                "c13_lower_limit": fromiter((self._c13_fluxes.get(r, [nan, nan])[0] for r in index), dtype=float,
+                                            count=n),
+                "c13_upper_limit": fromiter((self._c13_fluxes.get(r, [nan, nan])[1] for r in index), dtype=float,
+                                            count=n)}
+        return DataFrame(data, index=index, columns=["fluxes", "c13_lower_limit", "c13_upper_limit"], copy=False)
 
 
 class ExpressionBasedResult(FluxDistributionResult):
+    __slots__ = ("expression",)
+
     def __init__(self, fluxes, objective_value, expression, *args, **kwargs):
         super(ExpressionBasedResult, self).__init__(fluxes, objective_value, *args, **kwargs)
         self.expression = expression
 
 
 class GimmeResult(ExpressionBasedResult):
+    __slots__ = ("_expression", "_cutoff", "_fba_fluxes", "_score_cache",
+                 "_index", "_flux_array", "_fba_flux_array", "_expression_array")
+
     def __init__(self, fluxes, objective_value, fba_fluxes, reaction_expression, cutoff, *args, **kwargs):
+        self._score_cache = {}
+        self._expression_array = None
         super(GimmeResult, self).__init__(fluxes, objective_value, reaction_expression, *args, **kwargs)
+        self._index, self._flux_array = _split(self._fluxes)
         self._fba_fluxes = fba_fluxes
+        self._fba_flux_array = _to_array(fba_fluxes, self._index)
         self.cutoff = cutoff
 
+    @property
+    def expression(self):
+        return self._expression
+
+    @expression.setter
+    def expression(self, expression):
+        self._expression = expression
+        self._expression_array = None
+        self._score_cache.clear()
+
+    def _expression_values(self):
+        """
+        The expression values aligned with the fluxes, NaN for reactions without expression. Computed once per
+        expression assignment.
+        """
+        if self._expression_array is None:
+            self._expression_array = _to_array(self._expression, self._index)
+        return self._expression_array
+
+    @property
+    def cutoff(self):
+        return self._cutoff
+
+    @cutoff.setter
+    def cutoff(self, cutoff):
+        self._cutoff = cutoff
+        self._score_cache.clear()
+
     @property
     def data_frame(self):
-        index = list(self.fluxes.keys())
-        data = zeros((len(self._fluxes.keys()), 4))
-        data[:, 0] = [self._fluxes[r] for r in index]
-        data[:, 1] = [self._fba_fluxes[r] for r in index]
-        data[:, 2] = [self.expression.get(r, nan) for r in index]
-        data[:, 3] = [self.reaction_inconsistency_score(r) for r in index]
-        return DataFrame(data, index=index, columns=["gimme_fluxes", "fba_fluxes", "expression", "inconsistency_scores"])
+        expression = self._expression_values()
+        scores, _ = inconsistency_scores(self._flux_array, expression, self.cutoff)
+        data = {"gimme_fluxes": self._flux_array,
+                "fba_fluxes": self._fba_flux_array,
+                "expression": expression,
+                "inconsistency_scores": scores}
+        return DataFrame(data, index=self._index,
+                         columns=["gimme_fluxes", "fba_fluxes", "expression", "inconsistency_scores"])
 
     def reaction_inconsistency_score(self, reaction):
+        try:
+            return self._score_cache[reaction]
+        except KeyError:
+            pass
+
         if reaction in self.expression:
-            return abs(self._fluxes[reaction]) * max(self.cutoff - self.expression[reaction], 0)
+            score = abs(self._fluxes[reaction]) * max(self.cutoff - self.expression[reaction], 0)
         else:
-            return 0
+            score = 0
+        self._score_cache[reaction] = score
+        return score
 
     @property
     def distance(self):
-        return sum([abs(self.fluxes[r]-self._fba_fluxes[r]) for r in self.fluxes.keys()])
+        return float(absolute(self._flux_array - self._fba_flux_array).sum())
 
     @property
     def inconsistency_score(self):
-        return sum([self.reaction_inconsistency_score(reaction) for reaction in self.expression])
+        _, total = inconsistency_scores(self._flux_array, self._expression_values(), self.cutoff)
+        return total
 
     def trim_model(self, model, tm=None):
-        for r_id, flux in six.iteritems(self.fluxes):
-            expression = self.expression.get(r_id, self.cutoff+1)
-            if abs(flux) == 0 and expression < self.cutoff and self.reaction_inconsistency_score(r_id) <= 0:
-                model.reactions.get_by_id(r_id).knock_out(tm)
+        # inactive reactions have a zero inconsistency score, so only flux and expression need to be checked;
+        # reactions without expression are NaN and never compare below the cutoff
+        to_knockout = flatnonzero(isclose(self._flux_array, 0, atol=1e-9) & (self._expression_values() < self.cutoff))
+        for i in to_knockout:
+            model.reactions.get_by_id(self._index[i]).knock_out(tm)
 
 
 class IMATResult(ExpressionBasedResult):
+    __slots__ = ("lower_cutoff", "higher_cutoff", "epsilon")
+
     def __init__(self, fluxes, objective_value, expression, lower_cutoff, higher_cutoff, epsilon, *args, **kwargs):
         super(IMATResult, self).__init__(fluxes, objective_value, expression, *args, **kwargs)
         self.lower_cutoff = lower_cutoff
@@ -120,14 +194,15 @@ class IMATResult(ExpressionBasedResult):
 
     @property
     def data_frame(self):
-        index = list(self.fluxes.keys())
+        index, fluxes = _split(self._fluxes)
         columns = ["fluxes", "expression", "highly_express", "lowly_expressed"]
-        data = zeros((len(self._fluxes.keys()), 4))
-        data[:, 0] = [self.fluxes[r] for r in index]
-        data[:, 1] = [self.expression.get(r, nan) for r in index]
-        data[:, 2] = [self._highly_expressed(r) for r in index]
-        data[:, 3] = [self._lowly_expressed(r) for r in index]
-        return DataFrame(data, columns=columns, index=index)
+        expression = _to_array(self.expression, index)
+        not_measured = isnan(expression)
+        data = {"fluxes": fluxes,
+                "expression": expression,
+                "highly_express": where(not_measured, nan, expression >= self.higher_cutoff),
+                "lowly_expressed": where(not_measured, nan, expression < self.lower_cutoff)}
+        return DataFrame(data, columns=columns, index=index, copy=False)
 
 
 class FluxDistributionDiff(Result):
@@ -144,26 +219,34 @@ class FluxDistributionDiff(Result):
         self._b_key = b_key
         self._fluxes_b = flux_dist_b.fluxes
 
+        self._index = list(self._fluxes_a.keys())
+        self._update_arrays()
+
+    def _update_arrays(self):
+        self._a = _to_array(self._fluxes_a, self._index)
+        self._b = _to_array(self._fluxes_b, self._index)
+
     def normalize(self, reaction):
         if isinstance(reaction, Reaction):
             reaction = reaction.id
 
-        self._fluxes_a = {rid: flux/self._fluxes_a[reaction] for rid, flux in six.iteritems(self._fluxes_a)}
-        self._fluxes_b = {rid: flux/self._fluxes_b[reaction] for rid, flux in six.iteritems(self._fluxes_b)}
+        self._fluxes_a = {rid: flux/self._fluxes_a[reaction] for rid, flux in self._fluxes_a.items()}
+        self._fluxes_b = {rid: flux/self._fluxes_b[reaction] for rid, flux in self._fluxes_b.items()}
+        self._update_arrays()
 
     def _manhattan_distance(self, value):
         return abs(self._fluxes_a[value] - self._fluxes_b[value])
 
     @property
     def manhattan_distance(self):
-        return sum(self._manhattan_distance(rid) for rid in self._fluxes_a.keys())
+        return float(absolute(self._a - self._b).sum())
 
     def _euclidean_distance(self, value):
         return (self._fluxes_a[value] - self._fluxes_b[value])**2
 
     @property
     def euclidean_distance(self):
-        return sqrt(sum(self._euclidean_distance(rid) for rid in self._fluxes_a.keys()))
+        return sqrt(float(((self._a - self._b) ** 2).sum()))
 
     def _activity(self, value, threshold=1e-6):
         value_a = abs(self._fluxes_a[value])
@@ -180,7 +263,8 @@ class FluxDistributionDiff(Result):
 
     @property
     def activity_profile(self):
-        return {rid: self._activity(rid) for rid in self._fluxes_a.keys()}
+        return {rid: None if value == MISSING_ACTIVITY else float(value)
+                for rid, value in zip(self._index, activity(self._a, self._b, 1e-6))}
 
     def _fold_change(self, value):
         value_a = self._fluxes_a[value]
@@ -192,15 +276,17 @@ class FluxDistributionDiff(Result):
 
     @property
     def data_frame(self):
-        index = list(self._fluxes_a.keys())
         columns = ["fluxes_%s" % self._a_key, "fluxes_%s" % self._b_key,
                    "manhattan_distance", "euclidean_distance",
                    "activity_profile", "fold_change"]
-        data = zeros((len(self._fluxes_a.keys()), 6))
-        data[:, 0] = [self._fluxes_a[r] for r in index]
-        data[:, 1] = [self._fluxes_b[r] for r in index]
-        data[:, 2] = [self._manhattan_distance(r) for r in index]
-        data[:, 3] = [self._euclidean_distance(r) for r in index]
-        data[:, 4] = [self._activity(r) for r in index]
-        data[:, 5] = [self._fold_change(r) for r in index]
-        return DataFrame(data, index=index, columns=columns)
+        activity_profile = activity(self._a, self._b, 1e-6)
+        missing = activity_profile == MISSING_ACTIVITY
+        activity_profile = activity_profile.astype(float32)
+        activity_profile[missing] = nan
+        data = {columns[0]: self._a,
+                columns[1]: self._b,
+                columns[2]: absolute(self._a - self._b),
+                columns[3]: (self._a - self._b) ** 2,
+                columns[4]: activity_profile,
+                columns[5]: fold_change(self._a, self._b)}
+        return DataFrame(data, index=self._index, columns=columns)
@@ -37,24 +37,32 @@ def tmfa(model, objective=None, delta_gs=None, K=None, *args, **kwargs):
     """
     variables = []
     constraints = []
+    added = []
     original_objective = model.objective.expression
     try:
-        for reaction in model.reactions:
-            if reaction.id in delta_gs:
-                z = model.solver.interface.Variable("z_%s" % reaction.id, type='binary')
-                variables.append(z)
+        for reaction_id, delta_g in delta_gs.items():
+            if not model.reactions.has_id(reaction_id):
+                continue
+            reaction = model.reactions.get_by_id(reaction_id)
+            z = model.solver.interface.Variable("z_%s" % reaction_id, type='binary')
+            variables.append(z)
 
-                k_constraint = model.solver.interface.Constraint(delta_gs[reaction.id] - K + K*z,
-                                                                 ub=0,
-                                                                 name="second_law_constraint_%s" % reaction.id,
-                                                                 sloppy=True)
+            k_constraint = model.solver.interface.Constraint(delta_g - K + K*z,
+                                                             ub=0,
+                                                             name="second_law_constraint_%s" % reaction_id,
+                                                             sloppy=True)
 
-                flux_constraint = model.solver.interface.Constraint(z * reaction.upper_bound - reaction.flux_expression,
-                                                                    lb=0,
-                                                                    name="thermo_flux_constraint_%s" % reaction.id,
-                                                                    sloppy=True)
+            flux_constraint = model.solver.interface.Constraint(z * reaction.upper_bound - reaction.flux_expression,
+                                                                lb=0,
+                                                                name="thermo_flux_constraint_%s" % reaction_id,
+                                                                sloppy=True)
 
-                constraints.append([k_constraint, flux_constraint])
+            constraints.extend((k_constraint, flux_constraint))
+
+        model.add_cons_vars(variables)
+        added.extend(variables)
+        model.add_cons_vars(constraints, sloppy=True)
+        added.extend(constraints)
         # TODO: Not sure what this is meant to do..
         # with TimeMachine() as tm:
         #     tm(do=partial(setattr, model, 'objective', objective),
@@ -65,6 +73,5 @@ def tmfa(model, objective=None, delta_gs=None, K=None, *args, **kwargs):
         #        undo=partial(model.solver.remove, constraints))
 
     finally:
-        model.solver._remove_constraints(constraints)
-        model.solver._remove_variables(variables)
+        model.remove_cons_vars(added)
         model.objective = original_objective
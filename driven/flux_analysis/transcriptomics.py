@@ -16,16 +16,65 @@ from __future__ import absolute_import, print_function
 
 import numbers
 
-import six
-from sympy import Add
+from numpy import flatnonzero, fromiter, maximum
+from optlang.symbolics import Zero
+
+try:
+    from joblib import Parallel, delayed, effective_n_jobs
+except ImportError:
+    Parallel = None
 
-from cobra.flux_analysis import flux_variability_analysis as fva
 from cobra import Model
 from driven.data_sets.expression_profile import ExpressionProfile
 from driven.data_sets.normalization import or2min_and2max
 from driven.flux_analysis.results import GimmeResult, IMATResult
 
 
+def _reference_solution(model, objective_dist=None):
+    """
+    The objective value and the fluxes of the reference flux distribution, optimizing `model` unless `objective_dist`
+    is given.
+    """
+    if objective_dist is not None:
+        return objective_dist.objective_value, objective_dist.fluxes
+
+    # Only the objective value and the fluxes are needed, so skip the reduced costs and shadow prices
+    # that a full Solution would fetch.
+    objective_value = model.slim_optimize(error_value=None)
+    primal_values = model.solver.primal_values
+    fluxes = {reaction.id: primal_values[reaction.forward_variable.name] -
+              primal_values[reaction.reverse_variable.name] for reaction in model.reactions}
+    return objective_value, fluxes
+
+
+def _required_functionalities(model, fraction_of_optimum, objective_value):
+    """
+    A constraint keeping the current objective of `model` at `fraction_of_optimum` of `objective_value`.
+    """
+    if model.objective.direction == 'max':
+        return model.problem.Constraint(model.objective.expression, lb=fraction_of_optimum * objective_value,
+                                        name="required metabolic functionalities")
+    else:
+        return model.problem.Constraint(model.objective.expression, ub=fraction_of_optimum * objective_value,
+                                        name="required metabolic functionalities")
+
+
+def _gimme_coefficients(reactions, reaction_profile, cutoff):
+    """
+    The GIMME objective coefficients of the forward and reverse variables of the reactions expressed below `cutoff`.
+    """
+    reaction_ids = list(reaction_profile.keys())
+    expression = fromiter(reaction_profile.values(), dtype=float, count=len(reaction_ids))
+    coefficients = maximum(cutoff - expression, 0)
+
+    objective_coefficients = dict()
+    for i in flatnonzero(coefficients):
+        reaction = reactions[reaction_ids[i]]
+        objective_coefficients[reaction.forward_variable] = coefficients[i]
+        objective_coefficients[reaction.reverse_variable] = coefficients[i]
+    return objective_coefficients
+
+
 def gimme(model, expression_profile=None, cutoff=None, objective=None, objective_dist=None, fraction_of_optimum=0.9,
           normalization=or2min_and2max, condition=None, not_measured_value=None, *args, **kwargs):
     """
@@ -70,39 +119,167 @@ def gimme(model, expression_profile=None, cutoff=None, objective=None, objective
     with model:
         if objective is not None:
             model.objective = objective
-        objective_dist = model.optimize(raise_error=True) if objective_dist is None else objective_dist
-
-        if model.objective.direction == 'max':
-            fix_obj_constraint = model.problem.Constraint(model.objective.expression,
-                                                          lb=fraction_of_optimum * objective_dist.objective_value,
-                                                          name="required metabolic functionalities")
-        else:
-            fix_obj_constraint = model.problem.Constraint(model.objective.expression,
-                                                          ub=fraction_of_optimum * objective_dist.objective_value,
-                                                          name="required metabolic functionalities")
-        objective_terms = list()
-
-        condition = expression_profile.conditions[0] if condition is None else condition
+        objective_value, fba_fluxes = _reference_solution(model, objective_dist)
+        fix_obj_constraint = _required_functionalities(model, fraction_of_optimum, objective_value)
+        condition = 0 if condition is None else condition
         not_measured_value = cutoff if not_measured_value is None else not_measured_value
 
         reaction_profile = expression_profile.to_reaction_dict(condition, model, not_measured_value, normalization)
-        coefficients = {r: cutoff - exp if cutoff > exp else 0 for r, exp in six.iteritems(reaction_profile)}
-
-        for rid, coefficient in six.iteritems(coefficients):
-            reaction = model.reactions.get_by_id(rid)
-            if coefficient > 0:
-                objective_terms.append(coefficient * (reaction.forward_variable + reaction.reverse_variable))
+        reactions = {reaction.id: reaction for reaction in model.reactions}
+        objective_coefficients = _gimme_coefficients(reactions, reaction_profile, cutoff)
 
-        gimme_objective = model.problem.Objective(Add(*objective_terms), direction="min")
-        model.objective = gimme_objective
+        model.objective = model.problem.Objective(Zero, direction="min", sloppy=True)
+        model.objective.set_linear_coefficients(objective_coefficients)
         model.add_cons_vars(fix_obj_constraint)
         solution = model.optimize()
-        return GimmeResult(solution.fluxes, solution.objective_value, objective_dist.fluxes, reaction_profile, cutoff)
+        return GimmeResult(solution.fluxes, solution.objective_value, fba_fluxes, reaction_profile, cutoff)
+
+
+def gimme_iter(model, expression_profile=None, cutoff=None, conditions=None, objective=None, objective_dist=None,
+               fraction_of_optimum=0.9, normalization=or2min_and2max, not_measured_value=None, *args, **kwargs):
+    """
+    GIMME over several conditions of an expression profile.
+
+    The required metabolic functionalities are fixed once and a single objective is reused for all conditions; only
+    its coefficients change between them. All conditions are solved before the first result is yielded, so the model
+    is already restored while the results are consumed.
+
+    Parameters
+    ----------
+    model: cobra.Model
+        A constraint based model
+    expression_profile: ExpressionProfile
+        An expression profile
+    cutoff: float
+        inactivity threshold
+    conditions: list or None
+        The conditions (names or indices) from the expression profile. If None (default), all conditions are used.
+    objective: str or other cameo compatible objective
+        The Minimal Required Functionalities (MRF)
+    objective_dist: FluxDistributionResult
+        A predetermined flux distribution for the objective can be provided (optional)
+    fraction_of_optimum: float
+        The fraction of the MRF
+    normalization: function
+        The normalization function to convert the gene expression profile into reaction expression profile
+        (default: max)
+
+    Yields
+    ------
+    GimmeResult
+        One result per condition, in the order of `conditions`.
+
+    See Also
+    --------
+    gimme
+    """
+
+    assert isinstance(model, Model)
+    assert isinstance(expression_profile, ExpressionProfile)
+    assert isinstance(fraction_of_optimum, numbers.Number)
+    assert isinstance(cutoff, numbers.Number)
+
+    conditions = expression_profile.conditions if conditions is None else conditions
+    not_measured_value = cutoff if not_measured_value is None else not_measured_value
+
+    with model:
+        if objective is not None:
+            model.objective = objective
+        objective_value, fba_fluxes = _reference_solution(model, objective_dist)
+        model.add_cons_vars(_required_functionalities(model, fraction_of_optimum, objective_value))
+        model.objective = model.problem.Objective(Zero, direction="min", sloppy=True)
+
+        reactions = {reaction.id: reaction for reaction in model.reactions}
+        previous_coefficients = dict()
+        results = list()
+        for condition in conditions:
+            reaction_profile = expression_profile.to_reaction_dict(condition, model, not_measured_value, normalization)
+            objective_coefficients = _gimme_coefficients(reactions, reaction_profile, cutoff)
+
+            coefficients = {variable: 0 for variable in previous_coefficients}
+            coefficients.update(objective_coefficients)
+            model.objective.set_linear_coefficients(coefficients)
+            previous_coefficients = objective_coefficients
+
+            solution = model.optimize()
+            results.append(GimmeResult(solution.fluxes, solution.objective_value, fba_fluxes, reaction_profile,
+                                       cutoff))
+
+    # Results are only handed out once the model is restored, so callers never see it mid-analysis.
+    for result in results:
+        yield result
+
+
+def _flux_ranges(model, reaction_ids, objective, objective_bound):
+    """
+    Minimize and maximize the flux of each reaction while the objective is kept at `objective_bound`.
+
+    Returns
+    -------
+    tuple
+        Two dicts mapping the reaction ids to their minimum and maximum flux.
+    """
+    lower = dict()
+    upper = dict()
+    with model:
+        if objective is not None:
+            model.objective = objective
+        if model.objective.direction == 'max':
+            model.add_cons_vars(model.problem.Constraint(model.objective.expression, lb=objective_bound))
+        else:
+            model.add_cons_vars(model.problem.Constraint(model.objective.expression, ub=objective_bound))
+
+        # All minimizations run before all maximizations and only the objective coefficients change between
+        # solves, so consecutive LPs start from a close basis.
+        reactions = [model.reactions.get_by_id(rid) for rid in reaction_ids]
+        model.objective = model.problem.Objective(Zero, sloppy=True)
+        previous = None
+        for direction, ranges in (("min", lower), ("max", upper)):
+            model.objective.direction = direction
+            for reaction in reactions:
+                coefficients = dict()
+                if previous is not None:
+                    coefficients.update({previous.forward_variable: 0, previous.reverse_variable: 0})
+                coefficients.update({reaction.forward_variable: 1, reaction.reverse_variable: -1})
+                model.objective.set_linear_coefficients(coefficients)
+                ranges[reaction.id] = model.slim_optimize()
+                previous = reaction
+
+    return lower, upper
+
+
+def _fva(model, reaction_ids, objective=None, fraction_of_optimum=1.0, n_jobs=-1):
+    """
+    Flux variability analysis of `reaction_ids`, split across `n_jobs` workers when joblib is installed.
+
+    Returns
+    -------
+    dict
+        The minimum and maximum flux of each reaction under the keys "minimum" and "maximum".
+    """
+    with model:
+        if objective is not None:
+            model.objective = objective
+        objective_bound = fraction_of_optimum * model.optimize(raise_error=True).objective_value
+
+    n_workers = 1 if Parallel is None else min(effective_n_jobs(n_jobs), len(reaction_ids))
+    if n_workers > 1:
+        ranges = Parallel(n_jobs=n_workers, backend="loky")(
+            delayed(_flux_ranges)(model, reaction_ids[i::n_workers], objective, objective_bound)
+            for i in range(n_workers))
+    else:
+        ranges = [_flux_ranges(model, reaction_ids, objective, objective_bound)]
+
+    result = {"minimum": dict(), "maximum": dict()}
+    for lower, upper in ranges:
+        result["minimum"].update(lower)
+        result["maximum"].update(upper)
+    return result
 
 
 def imat(model, expression_profile=None, low_cutoff=0.25, high_cutoff=0.85, epsilon=0.1, condition=None,
          normalization=or2min_and2max, fraction_of_optimum=0.99, objective=None, not_measured_value=None,
-         *args, **kwargs):
+         n_jobs=-1, solver=None, *args, **kwargs):
     """
     Integrative Metabolic Analysis Tool
 
@@ -117,6 +294,10 @@ def imat(model, expression_profile=None, low_cutoff=0.25, high_cutoff=0.85, epsi
     high_cutoff: number
         The cut off value for high expression values
     epsilon: float
+    n_jobs: int
+        The number of processes used for flux variability analysis (default: all CPUs, requires joblib)
+    solver: str or None
+        The solver used for the mixed integer problem, e.g. "highs" (default: the model's solver)
     """
 
     assert isinstance(model, Model)
@@ -124,77 +305,100 @@ def imat(model, expression_profile=None, low_cutoff=0.25, high_cutoff=0.85, epsi
     assert isinstance(high_cutoff, numbers.Number)
     assert isinstance(low_cutoff, numbers.Number)
 
-    condition = expression_profile.conditions[0] if condition is None else condition
+    condition = 0 if condition is None else condition
     not_measured_value = 0 if not_measured_value is None else not_measured_value
 
     reaction_profile = expression_profile.to_reaction_dict(condition, model, not_measured_value, normalization)
+    reaction_ids = list(reaction_profile.keys())
+    expression = fromiter(reaction_profile.values(), dtype=float, count=len(reaction_ids))
+    highly_expressed = [reaction_ids[i] for i in flatnonzero(expression >= high_cutoff)]
+    lowly_expressed = [reaction_ids[i] for i in flatnonzero(expression < low_cutoff)]
 
-    y_variables = list()
-    x_variables = list()
-    constraints = list()
-    try:
-
+    if len(highly_expressed) == 0 and len(lowly_expressed) == 0:
+        # Without binaries every feasible flux distribution is optimal for iMAT; return the FBA one.
         with model:
             if objective is not None:
                 model.objective = objective
-            fva_res = fva(model, reactions=list(reaction_profile.keys()),
-                          fraction_of_optimum=fraction_of_optimum)
-
-        for rid, expression in six.iteritems(reaction_profile):
-            if expression >= high_cutoff:
-                reaction = model.reactions.get_by_id(rid)
-                y_pos = model.solver.interface.Variable("y_%s_pos" % rid, type="binary")
-                y_neg = model.solver.interface.Variable("y_%s_neg" % rid, type="binary")
-
-                y_variables.append([y_neg, y_pos])
-
-                pos_constraint = model.solver.interface.Constraint(
-                    reaction.flux_expression + y_pos * (fva_res["minimum"][rid] - epsilon),
-                    lb=fva_res["minimum"][rid], name="pos_highly_%s" % rid)
-
-                neg_constraint = model.solver.interface.Constraint(
-                    reaction.flux_expression + y_neg * (fva_res["maximum"][rid] + epsilon),
-                    ub=fva_res["maximum"][rid], name="neg_highly_%s" % rid)
-
-                constraints.extend([pos_constraint, neg_constraint])
-
-            elif expression < low_cutoff:
-                reaction = model.reactions.get_by_id(rid)
-                x = model.solver.interface.Variable("x_%s" % rid, type="binary")
-                x_variables.append(x)
-
-                pos_constraint = model.solver.interface.Constraint(
-                    (1 - x) * fva_res["maximum"][rid] - reaction.flux_expression,
-                    lb=0, name="x_%s_upper" % rid)
-
-                neg_constraint = model.solver.interface.Constraint(
-                    (1 - x) * fva_res["minimum"][rid] - reaction.flux_expression,
-                    ub=0, name="x_%s_lower" % rid)
-
-                constraints.extend([pos_constraint, neg_constraint])
-
-        for variable in x_variables:
-            model.solver.add(variable)
-
-        for variables in y_variables:
-            model.solver.add(variables[0])
-            model.solver.add(variables[1])
-
-        for constraint in constraints:
-            model.solver.add(constraint)
+            solution = model.optimize()
+            return IMATResult(solution.fluxes, 0, reaction_profile, low_cutoff, high_cutoff, epsilon)
 
-        objective = model.solver.interface.Objective(Add(*[(y[0] + y[1]) for y in y_variables]) + Add(*x_variables),
-                                                     direction="max")
+    y_variables = list()
+    x_variables = list()
+    constraints = list()
+    added = list()
+    try:
+        fva_res = _fva(model, highly_expressed + lowly_expressed, objective, fraction_of_optimum, n_jobs)
+
+        reactions = {reaction.id: reaction for reaction in model.reactions}
+
+        # The constraints are created empty and filled with set_linear_coefficients once they are in the solver,
+        # which avoids building a symbolic expression for each of them.
+        constraint_coefficients = list()
+        for rid in highly_expressed:
+            reaction = reactions[rid]
+            lower = fva_res["minimum"][rid]
+            upper = fva_res["maximum"][rid]
+            y_pos = model.solver.interface.Variable("y_%s_pos" % rid, type="binary")
+            y_neg = model.solver.interface.Variable("y_%s_neg" % rid, type="binary")
+
+            y_variables.append([y_neg, y_pos])
+
+            pos_constraint = model.solver.interface.Constraint(
+                Zero, lb=lower, name="pos_highly_%s" % rid, sloppy=True)
+            constraint_coefficients.append({reaction.forward_variable: 1, reaction.reverse_variable: -1,
+                                            y_pos: lower - epsilon})
+
+            neg_constraint = model.solver.interface.Constraint(
+                Zero, ub=upper, name="neg_highly_%s" % rid, sloppy=True)
+            constraint_coefficients.append({reaction.forward_variable: 1, reaction.reverse_variable: -1,
+                                            y_neg: upper + epsilon})
+
+            constraints.extend([pos_constraint, neg_constraint])
+
+        for rid in lowly_expressed:
+            reaction = reactions[rid]
+            lower = fva_res["minimum"][rid]
+            upper = fva_res["maximum"][rid]
+            x = model.solver.interface.Variable("x_%s" % rid, type="binary")
+            x_variables.append(x)
+
+            # (1 - x) * upper - flux >= 0
+            pos_constraint = model.solver.interface.Constraint(
+                Zero, ub=upper, name="x_%s_upper" % rid, sloppy=True)
+            constraint_coefficients.append({reaction.forward_variable: 1, reaction.reverse_variable: -1,
+                                            x: upper})
+
+            # (1 - x) * lower - flux <= 0
+            neg_constraint = model.solver.interface.Constraint(
+                Zero, lb=lower, name="x_%s_lower" % rid, sloppy=True)
+            constraint_coefficients.append({reaction.forward_variable: 1, reaction.reverse_variable: -1,
+                                            x: lower})
+
+            constraints.extend([pos_constraint, neg_constraint])
+
+        variables = x_variables + [variable for pair in y_variables for variable in pair]
+        model.add_cons_vars(variables)
+        added.extend(variables)
+        model.add_cons_vars(constraints, sloppy=True)
+        added.extend(constraints)
+        # optlang only queues new constraints; they must be in the solver before their coefficients can be set.
+        model.solver.update()
+        for constraint, coefficients in zip(constraints, constraint_coefficients):
+            constraint.set_linear_coefficients(coefficients)
 
         with model:
-            model.objective = objective
+            if solver is not None:
+                model.solver = solver
+            # Swapping the solver clones the problem, so the binaries are looked up on the solver in use.
+            solver_variables = model.solver.variables
+            objective_coefficients = {solver_variables[variable.name]: 1 for variable in variables}
+            model.objective = model.solver.interface.Objective(Zero, direction="max", sloppy=True)
+            model.objective.set_linear_coefficients(objective_coefficients)
             solution = model.optimize()
             return IMATResult(solution.fluxes, solution.f, reaction_profile, low_cutoff, high_cutoff, epsilon)
 
     finally:
-        model.solver.remove([var for var in x_variables if var in model.solver.variables])
-        model.solver.remove([var for pair in y_variables for var in pair if var in model.solver.variables])
-        model.solver.remove([const for const in constraints if const in model.solver.constraints])
+        model.remove_cons_vars(added)
 
 
 def made(model, objective=None, *args, **kwargs):
@@ -6,25 +6,31 @@
 
 # http://www.apache.org/licenses/LICENSE-2.0
 
-from functools import partial as p
-
 # Unless required by applicable law or agreed to in writing, software
 # distributed under the License is distributed on an "AS IS" BASIS,
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+
 import six
+from numpy import arange
 from pandas import DataFrame
 
-from cameo.util import TimeMachine
 from cobra import Model
 from driven.data_sets.expression_profile import ExpressionProfile
-from driven.vizualization.plotting import plotting
 
 
 def expression_sensitivity_analysis(method, model, expression_profile, metrics, condition_exchanges=None,
                                     condition_knockouts=None, growth_rates=None, growth_rates_std=None,
                                     growth_reaction=None, **kwargs):
+    """
+    Runs `method` over a range of expression cutoffs for every condition of the expression profile.
+
+    Returns
+    -------
+    list
+        A pandas.DataFrame per metric, with the cutoff (x), the metric value (y) and the condition of each run.
+    """
 
     assert isinstance(model, Model)
     assert isinstance(expression_profile, ExpressionProfile)
@@ -33,36 +39,51 @@ def expression_sensitivity_analysis(method, model, expression_profile, metrics,
     if condition_knockouts is None:
         condition_knockouts = {}
 
-    data_frames = [DataFrame(columns=["x", "y", "condition"]) for _ in metrics]
+    if isinstance(growth_reaction, six.string_types):
+        growth_reaction = model.reactions.get_by_id(growth_reaction)
+    exchange_items = list(condition_exchanges.items())
+    exchanges = [ex for _, ex in exchange_items]
+
+    cutoffs = list()
+    conditions = list()
+    values = [list() for _ in metrics]
 
     for condition in expression_profile.conditions:
-        with TimeMachine() as tm:
-            for exchange_condition, ex in six.iteritems(condition_exchanges):
-                if exchange_condition == condition:
-                    tm(do=p(setattr, ex, "lower_bound", -10), undo=p(setattr, ex, "lower_bound", ex.lower_bound))
-                else:
-                    tm(do=p(setattr, ex, "lower_bound", 0), undo=p(setattr, ex, "lower_bound", ex.lower_bound))
+        knockouts = [model.reactions.get_by_id(knockout) for knockout in condition_knockouts.get(condition, [])]
+
+        changed_reactions = exchanges + knockouts
+        if growth_reaction is not None:
+            changed_reactions.append(growth_reaction)
+        saved_bounds = [(reaction, reaction.bounds) for reaction in changed_reactions]
+
+        try:
+            for exchange_condition, ex in exchange_items:
+                lower_bound = -10 if exchange_condition == condition else 0
+                # Every bound change reaches the solver, so leave bounds that already have the value alone.
+                if ex.lower_bound != lower_bound:
+                    ex.lower_bound = lower_bound
 
-            for knockout in condition_knockouts.get(condition, []):
-                model.reactions.get_by_id(knockout).knock_out(tm)
+            for knockout in knockouts:
+                knockout.knock_out()
 
             if growth_reaction is not None:
                 growth_rate = growth_rates[condition]
                 growth_std = growth_rates_std[condition]
-                if isinstance(growth_reaction, str):
-                    growth_reaction = model.reactions.get_by_id(growth_reaction)
+                growth_reaction.bounds = (growth_rate - growth_std, growth_rate + growth_std)
 
-                tm(do=p(setattr, growth_reaction, "lower_bound", growth_rate-growth_std),
-                   undo=p(setattr, growth_reaction, "lower_bound", growth_reaction.upper_bound))
-                tm(do=p(setattr, growth_reaction, "upper_bound", growth_rate+growth_std),
-                   undo=p(setattr, growth_reaction, "upper_bound", growth_reaction.upper_bound))
             min_val, max_val = expression_profile.minmax(condition)
-            binwidth = expression_profile.binwidth(condition)
+            binwidth = expression_profile.bin_width(condition)
 
-            for i, exp in enumerate(range(min_val, max_val, binwidth)):
+            for exp in arange(min_val, max_val, binwidth):
                 res = method(model, expression_profile=expression_profile, condition=condition, cutoff=exp, **kwargs)
+                cutoffs.append(exp)
+                conditions.append(condition)
                 for j, metric in enumerate(metrics):
-                    data_frames[j].loc[i] = [exp, getattr(res, metric), metric]
+                    values[j].append(getattr(res, metric))
+        finally:
+            for reaction, bounds in saved_bounds:
+                if reaction.bounds != bounds:
+                    reaction.bounds = bounds
 
-    for i, metric in enumerate(metrics):
-        plotting.line(data_frames[i], x=metric, y="cutoff")
+    return [DataFrame({"x": cutoffs, "y": metric_values, "condition": conditions}, columns=["x", "y", "condition"])
+            for metric_values in values]
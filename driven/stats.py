@@ -11,16 +11,33 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import math
-
 import numpy as np
 
+# The numba kernel lives in its own module, imported on the first call that can use it, so that importing driven does
+# not import numba.
+_iqr_kernel = None
+
+
+def _compiled_iqr():
+    global _iqr_kernel
+    if _iqr_kernel is None:
+        try:
+            from driven._stats_kernels import iqr as kernel
+        except ImportError:
+            kernel = False
+        _iqr_kernel = kernel
+    return _iqr_kernel
+
 
 def iqr(sample):
-    q75, q25 = np.percentile(sample, [75, 25])
+    if isinstance(sample, np.ndarray) and sample.ndim == 1 and sample.size > 0 and sample.dtype == np.float64:
+        kernel = _compiled_iqr()
+        if kernel:
+            return kernel(sample)
+    q25, q75 = np.percentile(sample, [25, 75])
     return q75 - q25
 
 
 def freedman_diaconis(sample):
     n = len(sample)
-    return 2 * iqr(sample) * math.pow(n, -1/3)
+    return 2 * iqr(sample) * n ** (-1. / 3)
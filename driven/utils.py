@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from itertools import takewhile
+
 
 def all_same(seq):
     """
@@ -20,9 +22,8 @@ def all_same(seq):
     seq: list
     """
 
-    # Compare all the elements to the first in the sequence,
-    # then do a logical and (min) to see if they all matched.
-    return min([elem == seq[0] for elem in seq]+[True])
+    # Compare all the elements to the first in the sequence, stopping at the first mismatch.
+    return all(elem == seq[0] for elem in seq)
 
 
 def get_common_start(*seq_list):
@@ -32,6 +33,5 @@ def get_common_start(*seq_list):
     Raises
         an exception if the list is empty.
     """
-    m = [all_same(seq) for seq in zip(*seq_list)]  # Map the matching elements
-    m.append(False)                                # Guard in case all the sequences match
-    return seq_list[0][0:m.index(False)]           # Truncate before first mismatch
+    length = sum(1 for _ in takewhile(all_same, zip(*seq_list)))  # Count the leading matching elements
+    return seq_list[0][0:length]                                    # Truncate before first mismatch
@@ -16,12 +16,7 @@ from __future__ import absolute_import, print_function
 
 import os
 
-import numpy as np
-import six
-from IPython.display import display
-from pandas import DataFrame
-
-from cameo.visualization.escher_ext import NotebookBuilder
+from pandas import DataFrame, Series
 
 
 class EscherViewer(object):
@@ -34,9 +29,14 @@ class EscherViewer(object):
         self.normalization_functions = normalization_functions
 
     def __call__(self, column):
-        reaction_data = dict(self.data_frame.dropna()[column].apply(self.normalization_functions[column]))
-        reaction_data = {r: v for r, v in six.iteritems(reaction_data) if v is not None}
-        reaction_data = {r: v for r, v in six.iteritems(reaction_data) if v is not np.nan}
+        data = self.data_frame.dropna()[column]
+        normalization = self.normalization_functions[column]
+        # Functions flagged as vectorized get the whole column as an array instead of one value at a time.
+        if getattr(normalization, "vectorized", False):
+            values = Series(normalization(data.values), index=data.index)
+        else:
+            values = data.apply(normalization)
+        reaction_data = dict(values[values.notnull()])
         reaction_scale = self.color_scales[column]
         if self.builder is None:
             self._init_builder(reaction_data, reaction_scale)
@@ -44,6 +44,10 @@ class EscherViewer(object):
             self.builder.update(reaction_data=reaction_data, reaction_scale=reaction_scale)
 
     def _init_builder(self, reaction_data, reaction_scale):
+        # IPython and escher are only needed once a map is rendered, keep them out of the import path.
+        from IPython.display import display
+        from cameo.visualization.escher_ext import NotebookBuilder
+
         if os.path.isfile(self.map_name):
             self.builder = NotebookBuilder(map_json=self.map_name,
                                            reaction_data=reaction_data,
@@ -19,40 +19,52 @@ from driven.vizualization.plotting.abstract import Plotter
 
 __all__ = ["plotting"]
 
-_engine = None
-_engines = {}
 
-try:
+def _bokeh():
     from driven.vizualization.plotting.with_bokeh import BokehPlotter
-    _engine = BokehPlotter()
-    _engines["bokeh"] = BokehPlotter
-except ImportError:
-    pass
+    return BokehPlotter
 
-try:
+
+def _ggplot():
     from driven.vizualization.plotting.with_ggplot import GGPlotPlotter
-    _engine = GGPlotPlotter() if _engine is None else _engine
-    _engines["ggplot"] = GGPlotPlotter
-except (ImportError, RuntimeError):
-    pass
+    return GGPlotPlotter
+
+
+# The backends are only imported when an engine is first needed, in order of preference.
+_engines = {"bokeh": _bokeh, "ggplot": _ggplot}
+_preference = ["bokeh", "ggplot"]
+
+
+def _default_engine():
+    for name in _preference:
+        try:
+            return _engines[name]()()
+        except (ImportError, RuntimeError):
+            continue
+    return None
 
 
 class _plotting:
-    def __init__(self, engine):
-        self.__dict__['_engine'] = engine
+    def __init__(self):
+        self.__dict__['_engine'] = None
+
+    def _resolve(self):
+        if self.__dict__['_engine'] is None:
+            self.__dict__['_engine'] = _default_engine()
+        return self.__dict__['_engine']
 
     def __getattr__(self, item):
         if item not in ["_engine", "engine"]:
-            return getattr(self.__dict__['_engine'], item)
+            return getattr(self._resolve(), item)
         else:
-            return self.__dict__['_engine']
+            return self._resolve()
 
     def __setattr__(self, key, item):
         if key not in ["_engine", "engine"]:
             raise KeyError(key)
         else:
             if isinstance(item, six.string_types):
-                item = _engines[item]()
+                item = _engines[item]()()
 
             if not isinstance(item, Plotter):
                 raise AssertionError("Invalid engine %s" % item)
@@ -60,4 +72,4 @@ class _plotting:
             self.__dict__['_engine'] = item
 
 
-plotting = _plotting(_engine)
+plotting = _plotting()
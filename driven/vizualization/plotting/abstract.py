@@ -11,6 +11,8 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from numpy import float32, float64
+
 from driven.vizualization.utils import golden_ratio
 
 
@@ -19,10 +21,36 @@ class Plotter(object):
         'palette': 'Spectral',
         'width': 800,
         'color': "#AFDCEC",
+        'downcast': False,
     }
 
     def __init__(self, **defaults):
         self.__default_options__.update(defaults)
+        # Most plots use the default size, so it is computed once here.
+        width, height = self.__default_options__.get('width'), self.__default_options__.get('height')
+        self._default_size = (width, height) if width is None and height is None else golden_ratio(width, height)
+
+    def _resolve_options(self, *options):
+        """
+        Resolves (name, value) pairs to their values, using the default option of that name when the value is None.
+        """
+        defaults = self.__default_options__
+        return [defaults.get(name) if value is None else value for name, value in options]
+
+    def _downcast(self, dataframe, *columns):
+        """
+        Converts the float64 `columns` to float32 when the 'downcast' option is set, halving the data sent to the
+        plotting backend. Returns `dataframe` itself otherwise.
+        """
+        if not self.__default_options__.get('downcast', False):
+            return dataframe
+        columns = [column for column in columns if column is not None and dataframe[column].dtype == float64]
+        if len(columns) == 0:
+            return dataframe
+        dataframe = dataframe.copy()
+        for column in columns:
+            dataframe[column] = dataframe[column].astype(float32)
+        return dataframe
 
     def _palette(self, palette, *args, **kwargs):
         raise NotImplementedError
@@ -46,8 +74,11 @@ class Plotter(object):
                 title="BoxPlot", legend=True):
         raise NotImplementedError
 
-    @staticmethod
-    def _width_height(width, height):
+    def _width_height(self, width, height):
+        if width is None:
+            if height is None:
+                return self._default_size
+            width = self.__default_options__.get('width')
         if width is None or height is None:
             return golden_ratio(width, height)
         else:
@@ -12,18 +12,59 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import collections
+from itertools import cycle
 
 import six
-from bokeh.charts import BoxPlot, HeatMap, Histogram, Line, Scatter
 from bokeh.io import show
-from bokeh.models import GlyphRenderer, HoverTool
+from bokeh.models import ColumnDataSource, HoverTool, LinearColorMapper
 from bokeh.palettes import brewer
+from bokeh.plotting import figure
+from numpy import histogram as numpy_histogram
+from numpy import column_stack, concatenate, diff, flatnonzero, maximum, minimum, ndarray, repeat
+from pandas import DataFrame, Series, unique
 
 from driven.vizualization.plotting.abstract import Plotter
 
 TOOLS = 'pan,box_zoom,wheel_zoom,resize,reset,save'
 
+# Largest number of colors available in each brewer palette.
+_MAX_N = {name: max(sizes) for name, sizes in brewer.items()}
+
+
+def _source(dataframe, *columns):
+    """
+    A ColumnDataSource holding only the plotted `columns` of `dataframe`, as numpy arrays.
+    """
+    return ColumnDataSource(data={column: dataframe[column].values for column in columns if column is not None})
+
+
+def _envelope(x, y, n_bins):
+    """
+    Reduces a line with increasing `x` to the minimum and maximum `y` of each of `n_bins` equally wide x intervals.
+
+    Returns
+    -------
+    tuple
+        The x and y values of the reduced line, two points per non-empty interval.
+    """
+    span = x[-1] - x[0]
+    if span <= 0:
+        return x, y
+    bins = minimum((x - x[0]) * (float(n_bins) / span), n_bins - 1).astype(int)
+    starts = concatenate(([0], flatnonzero(diff(bins)) + 1))
+    lower = minimum.reduceat(y, starts)
+    upper = maximum.reduceat(y, starts)
+    return repeat(x[starts], 2), column_stack((lower, upper)).ravel()
+
+
+def _reduce_line(frame, x, y, n_bins):
+    """
+    Envelope-reduces the line `y` over `x` of `frame` to about 2 * `n_bins` points.
+    """
+    frame = frame.sort_values(x)
+    xs, ys = _envelope(frame[x].values, frame[y].values, n_bins)
+    return DataFrame({x: xs, y: ys})
+
 
 class BokehPlotter(Plotter):
     def __init__(self, **defaults):
@@ -31,9 +72,11 @@ class BokehPlotter(Plotter):
 
     def _palette(self, palette, number, **kwargs):
         if isinstance(palette, six.string_types):
-            n = 3 if number < 3 else number
-            return brewer[palette][n]
-        elif isinstance(palette, collections.Iterable):
+            sizes = brewer.get(palette)
+            if sizes is None:
+                raise ValueError("Invalid palette %s" % palette)
+            return sizes[min(max(number, 3), _MAX_N[palette])]
+        elif isinstance(palette, (list, tuple, ndarray)):
             return palette
         else:
             raise ValueError("Invalid palette %s" % palette)
@@ -41,41 +84,49 @@ class BokehPlotter(Plotter):
     def histogram(self, dataframe, bins=None, width=None, height=None, palette=None, title='Histogram', values=None,
                   groups=None, legend=True):
         palette = self.__default_options__.get('palette', None) if palette is None else palette
-        width = self.__default_options__.get('width', None) if width is None else width
+        width, height = self._width_height(width, height)
 
-        if values:
-            unique_values = dataframe[groups].unique()
-            palette = self._palette(palette, len(unique_values))
-        else:
-            palette = None
+        if values is None:
+            if len(dataframe.columns) != 1:
+                raise ValueError("values must name the column to plot when the dataframe has several columns")
+            values = dataframe.columns[0]
 
-        width, height = self._width_height(width, height)
+        data = dataframe.dropna(subset=[values])
+        # Bin all the values once with numpy so every group shares the same edges and only the counts are plotted.
+        _, edges = numpy_histogram(data[values].values, bins=10 if bins is None else bins)
+        if groups is None:
+            series = [(None, data[values].values)]
+        else:
+            series = [(group, frame[values].values) for group, frame in data.groupby(groups)]
 
-        histogram = Histogram(dataframe, values=values, color=groups, bins=bins, legend=True, width=width,
-                              height=height, palette=palette, title=title)
+        histogram = figure(plot_width=width, plot_height=height, title=title, tools=TOOLS)
+        for (group, group_values), color in zip(series, cycle(self._palette(palette, len(series)))):
+            counts, _ = numpy_histogram(group_values, bins=edges)
+            glyph_options = dict(legend=str(group)) if legend and group is not None else dict()
+            histogram.quad(top=counts, bottom=0, left=edges[:-1], right=edges[1:], fill_color=color, line_color=color,
+                           fill_alpha=0.6, **glyph_options)
 
         return histogram
 
     def scatter(self, dataframe, x=None, y=None, width=None, height=None, color=None, title=None,
                 xaxis_label=None, yaxis_label=None, label=None):
         color = self.__default_options__.get('color', None) if color is None else color
-        width = self.__default_options__.get('width', None) if width is None else width
 
         width, height = self._width_height(width, height)
-
-        scatter = Scatter(dataframe, x=x, y=y, width=width, height=height, color=color, title=title,
-                          tools=TOOLS + ',hover' if label else '')
+        dataframe = self._downcast(dataframe, x, y)
 
         if label:
-            hover = scatter.select_one(dict(type=HoverTool))
-            hover.tooltips = [("Id", "@%s" % label)]
-            renderer = scatter.select_one(dict(type=GlyphRenderer))
-            renderer.data_source.data[label] = dataframe[label].tolist()
+            tools = TOOLS.split(',') + [HoverTool(tooltips=[("Id", "@%s" % label)])]
+        else:
+            tools = ''
+
+        scatter = figure(plot_width=width, plot_height=height, title=title, tools=tools)
+        scatter.scatter(x, y, source=_source(dataframe, x, y, label), color=color)
 
         if xaxis_label:
-            scatter._xaxis.axis_label = xaxis_label
+            scatter.xaxis.axis_label = xaxis_label
         if yaxis_label:
-            scatter._yaxis.axis_label = yaxis_label
+            scatter.yaxis.axis_label = yaxis_label
 
         return scatter
 
@@ -83,32 +134,64 @@ class BokehPlotter(Plotter):
                 max_color=None, min_color=None, mid_color=None, title='Heatmap', xaxis_label=None, yaxis_label=None):
 
         palette = self.__default_options__.get('palette', None) if palette is None else palette
-        width = self.__default_options__.get('width', None) if width is None else width
 
         width, height = self._width_height(width, height)
+        dataframe = self._downcast(dataframe, values)
+
+        x_factors = dataframe[x].astype(str).values
+        y_factors = dataframe[y].astype(str).values
+        source = ColumnDataSource(data={x: x_factors, y: y_factors, values: dataframe[values].values})
+        mapper = LinearColorMapper(palette=self._palette(palette, 9),
+                                   low=dataframe[values].min(), high=dataframe[values].max())
+
+        heatmap = figure(plot_width=width, plot_height=height, title=title, tools=TOOLS,
+                         x_range=list(unique(x_factors)), y_range=list(unique(y_factors)))
+        heatmap.rect(x, y, width=1, height=1, source=source, line_color=None,
+                     fill_color={'field': values, 'transform': mapper})
 
-        heatmap = HeatMap(dataframe, x=x, y=y, values=values, width=width, height=height, palette=palette, title=title)
         if xaxis_label:
-            heatmap._xaxis.axis_label = xaxis_label
+            heatmap.xaxis.axis_label = xaxis_label
         if yaxis_label:
-            heatmap._yaxis.axis_label = yaxis_label
+            heatmap.yaxis.axis_label = yaxis_label
 
         return heatmap
 
     def line(self, dataframe, x=None, y=None, width=None, height=None, groups=None, palette=None, title="Line",
              xaxis_label=None, yaxis_label=None):
         palette = self.__default_options__.get('palette', None) if palette is None else palette
-        width = self.__default_options__.get('width', None) if width is None else width
 
         width, height = self._width_height(width, height)
+        # As bokeh.charts.Line did, plot against the index without x and every other column without y.
+        if x is None:
+            dataframe = dataframe.reset_index()
+            x = dataframe.columns[0]
+        if y is None:
+            columns = [column for column in dataframe.columns if column != x and column != groups]
+        else:
+            columns = list(y) if isinstance(y, (list, tuple)) else [y]
+        dataframe = self._downcast(dataframe, x, *columns)
 
-        line = Line(dataframe, x=x, y=y, color=groups, width=width, height=height, palette=palette, title=title,
-                    legend=True)
+        if groups is None:
+            frames = [(None, dataframe)]
+        else:
+            frames = list(dataframe.groupby(groups))
+        # One line per group and y column.
+        lines = [(group, column, frame) for group, frame in frames for column in columns]
+
+        line = figure(plot_width=width, plot_height=height, title=title, tools=TOOLS)
+        for (group, column, frame), color in zip(lines, cycle(self._palette(palette, len(lines)))):
+            # The canvas has about one column of pixels per unit of width; more points than that can't be told apart.
+            if len(frame) > 4 * width:
+                frame = _reduce_line(frame, x, column, width)
+            label = [str(group)] if group is not None else []
+            label += [str(column)] if len(columns) > 1 else []
+            glyph_options = dict(legend=" ".join(label)) if label else dict()
+            line.line(x, column, source=_source(frame, x, column), line_color=color, **glyph_options)
 
         if xaxis_label:
-            line._xaxis.axis_label = xaxis_label
+            line.xaxis.axis_label = xaxis_label
         if yaxis_label:
-            line._yaxis.axis_label = yaxis_label
+            line.yaxis.axis_label = yaxis_label
 
         return line
 
@@ -116,18 +199,43 @@ class BokehPlotter(Plotter):
                 title="BoxPlot", legend=True):
 
         palette = self.__default_options__.get('palette', None) if palette is None else palette
-        width = self.__default_options__.get('width', None) if width is None else width
-
-        if values:
-            unique_values = dataframe[groups].unique()
-            palette = self._palette(palette, len(unique_values))
-        else:
-            palette = None
 
         width, height = self._width_height(width, height)
 
-        boxplot = BoxPlot(dataframe, values=values, label=groups, color=groups, legend=True, width=width,
-                          height=height, palette=palette, title=title)
+        data = dataframe.dropna(subset=[values])
+        keys = Series(values, index=data.index) if groups is None else data[groups]
+        grouped = data[values].groupby(keys)
+        q1 = grouped.quantile(0.25)
+        q2 = grouped.median()
+        q3 = grouped.quantile(0.75)
+        iqr = q3 - q1
+
+        # Whiskers reach the most extreme values within 1.5 IQR of the box.
+        inside_lower = (data[values] >= keys.map(q1 - 1.5 * iqr)).values
+        inside_upper = (data[values] <= keys.map(q3 + 1.5 * iqr)).values
+        lower = data[values][inside_lower].groupby(keys[inside_lower]).min().reindex(q1.index)
+        upper = data[values][inside_upper].groupby(keys[inside_upper]).max().reindex(q1.index)
+
+        factors = [str(key) for key in q1.index]
+        colors = [color for color, _ in zip(cycle(self._palette(palette, len(factors))), factors)]
+        boxes = ColumnDataSource(data=dict(factor=factors, color=colors, lower=lower.values, q1=q1.values,
+                                           q2=q2.values, q3=q3.values, upper=upper.values))
+        # A legend string naming a column of the source gets one entry per box.
+        glyph_options = dict(legend="factor") if legend else dict()
+
+        boxplot = figure(plot_width=width, plot_height=height, title=title, tools=TOOLS, x_range=factors)
+        boxplot.segment("factor", "upper", "factor", "q3", line_color="black", source=boxes)
+        boxplot.segment("factor", "lower", "factor", "q1", line_color="black", source=boxes)
+        boxplot.vbar(x="factor", width=0.7, bottom="q2", top="q3", fill_color="color", line_color="black",
+                     source=boxes, **glyph_options)
+        boxplot.vbar(x="factor", width=0.7, bottom="q1", top="q2", fill_color="color", line_color="black",
+                     source=boxes)
+
+        # Values beyond the whiskers are drawn as outliers, as bokeh.charts.BoxPlot did.
+        outside = ~(inside_lower & inside_upper)
+        if outside.any():
+            boxplot.circle([str(key) for key in keys[outside]], data[values].values[outside], size=6,
+                           color="black", fill_alpha=0.6)
 
         return boxplot
 
@@ -11,19 +11,20 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import collections
-
 import six
 from ggplot import (
     aes, geom_histogram, geom_point, geom_tile, ggplot, ggtitle, scale_color_brewer, scale_colour_gradient2,
     scale_colour_manual, scale_x_continuous, scale_y_continuous)
 from matplotlib.ticker import Locator
+from numpy import ndarray
 
 from driven.vizualization.plotting.abstract import Plotter
 
 Locator.MAXTICKS = 15000
 
-class gradient:
+class gradient(object):
+    __slots__ = ("low", "mid", "high")
+
     def __init__(self, low, mid, high):
         self.low = low
         self.mid = mid
@@ -46,8 +47,7 @@ class GGPlotPlotter(Plotter):
 
     def scatter(self, dataframe, x=None, y=None, width=None, height=None, color=None, title='Scatter', xaxis_label=None,
                 yaxis_label=None, label=None):
-        color = self.__default_options__.get('palette', None) if color is None else color
-        width = self.__default_options__.get('width', None) if width is None else width
+        color, width = self._resolve_options(("palette", color), ("width", width))
 
         gg = ggplot(dataframe, aes(x, y)) + geom_point(color=color, alpha=0.6) + ggtitle(title)
         if xaxis_label:
@@ -59,10 +59,8 @@ class GGPlotPlotter(Plotter):
 
     def heatmap(self, dataframe, y=None, x=None, values=None, width=None, height=None,
                 max_color=None, min_color=None, mid_color=None, title='Heatmap'):
-        max_color = self.__default_options__.get('max_color', None) if max_color is None else max_color
-        min_color = self.__default_options__.get('min_color', None) if min_color is None else min_color
-        mid_color = self.__default_options__.get('mid_color', None) if mid_color is None else mid_color
-        width = self.__default_options__.get('width', None) if width is None else width
+        max_color, min_color, mid_color, width = self._resolve_options(
+            ("max_color", max_color), ("min_color", min_color), ("mid_color", mid_color), ("width", width))
 
         palette = gradient(min_color, mid_color, max_color)
         return ggplot(dataframe, aes(x=x, y=y, fill=values)) + \
@@ -74,8 +72,10 @@ class GGPlotPlotter(Plotter):
             return scale_color_brewer(type=type, palette=palette)
         elif isinstance(palette, gradient):
             return scale_colour_gradient2(low=palette.low, mid=palette.mid, high=palette.high)
-        elif isinstance(palette, collections.Iterable):
+        elif isinstance(palette, (list, tuple, ndarray)):
             return scale_colour_manual(values=palette)
+        else:
+            raise ValueError("Invalid palette %s" % palette)
 
     @classmethod
     def display(cls, plot):
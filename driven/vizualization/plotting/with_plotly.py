@@ -28,15 +28,16 @@ class PlotlyPlotter(Plotter):
                 yaxis_label=None, label=None):
 
         color = self.__default_options__.get('color', None) if color is None else color
-        width = self.__default_options__.get('width', None) if width is None else width
+        dataframe = self._downcast(dataframe, x, y)
 
-        scatter = Scatter(x=dataframe[x],
-                          y=dataframe[y],
+        scatter = Scatter(x=dataframe[x].values,
+                          y=dataframe[y].values,
                           mode='markers',
                           marker=dict(color=color))
 
         if label:
-            scatter['text'] = dataframe[label]
+            labels = dataframe[label]
+            scatter['text'] = labels.tolist() if labels.dtype == object else labels.values
 
         width, height = self._width_height(width, height)
 
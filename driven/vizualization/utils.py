@@ -13,13 +13,14 @@
 # limitations under the License.
 
 GOLDEN_NUMBER = 1.618033988
+_INVERSE_GOLDEN_NUMBER = 1 / GOLDEN_NUMBER
 
 
 def golden_ratio(width, height):
     if width is None:
-        width = int(height + height/GOLDEN_NUMBER)
+        width = int(height * (1 + _INVERSE_GOLDEN_NUMBER))
 
     elif height is None:
-        height = int(width/GOLDEN_NUMBER)
+        height = int(width * _INVERSE_GOLDEN_NUMBER)
 
     return width, height
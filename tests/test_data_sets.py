@@ -11,12 +11,16 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import os
+import tempfile
 import unittest
 
 import numpy as np
+from cobra import Model, Reaction
 
 from driven.data_sets.expression_profile import ExpressionProfile
 from driven.data_sets.fluxes import FluxConstraints
+from driven.data_sets.normalization import or2min_and2max
 
 
 class ExpressionProfileTestCase(unittest.TestCase):
@@ -33,6 +37,29 @@ class ExpressionProfileTestCase(unittest.TestCase):
 
         self.assertEqual(profile.differences(), {"G1": [0, 0, 1]})
 
+    def test_difference_directions(self):
+        genes = ["G1", "G2", "G3"]
+        conditions = ["T1", "T2", "T3"]
+
+        expression = np.array([[1., 2., 1.], [5., 5., np.nan], [3., 1., 2.]])
+        pvalues = np.array([[0.001, 0.001], [0.001, 0.001], [0.001, 0.5]])
+
+        profile = ExpressionProfile(genes, conditions, expression, pvalues)
+
+        # Up, down and equal; missing values and p-values above the threshold give 0.
+        self.assertEqual(profile.differences(), {"G1": [1, -1], "G2": [0, 0], "G3": [-1, 0]})
+        self.assertEqual(profile.differences(p_value=1.), {"G1": [1, -1], "G2": [0, 0], "G3": [-1, 1]})
+
+    def test_difference_without_p_values(self):
+        genes = ["G1", "G2"]
+        conditions = ["T1", "T2", "T3"]
+
+        expression = np.array([[1., 2., 1.], [3., 1., 2.]])
+
+        profile = ExpressionProfile(genes, conditions, expression)
+
+        self.assertEqual(profile.differences(), {"G1": [1, -1], "G2": [-1, 1]})
+
     def test_export_import(self):
         genes = ["G1"]
 
@@ -48,6 +75,82 @@ class ExpressionProfileTestCase(unittest.TestCase):
 
         self.assertEqual(profile, new_profile)
 
+    def test_from_csv_replicas(self):
+        handle, path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(handle, "w") as csv_file:
+            csv_file.write("gene,T1_a,T1_b,T2_a,T2_b,T3_a\n"
+                           "G1,1,3,2,,7\n"
+                           "G2,4,6,1,3,8\n")
+        try:
+            profile = ExpressionProfile.from_csv(path, replicas=2)
+        finally:
+            os.remove(path)
+
+        # The last group has a single replica; missing replicas are skipped.
+        self.assertEqual(profile.identifiers, ["G1", "G2"])
+        self.assertEqual(profile.conditions, ["T1_", "T2_", "T3_a"])
+        self.assertEqual(profile.expression.tolist(), [[2., 2., 7.], [5., 2., 8.]])
+
+    def test_values_for(self):
+        genes = ["G1", "G2", "G3"]
+        conditions = ["T1", "T2"]
+        expression = np.array([[1., 2.], [3., 4.], [5., 6.]])
+
+        profile = ExpressionProfile(genes, conditions, expression)
+
+        self.assertEqual(profile.values_for(["G3", "G1"], "T2").tolist(), [6., 2.])
+        self.assertEqual(profile.values_for(["G2"]).tolist(), [[3., 4.]])
+        self.assertEqual(profile.values_for(condition=0).tolist(), [1., 3., 5.])
+
+
+def _reaction_model():
+    model = Model("reaction dict")
+    rules = {"R1": "G1 and G2", "R2": "G3 or G4", "R3": "", "R4": "G1 and G5"}
+    reactions = []
+    for reaction_id in sorted(rules):
+        reaction = Reaction(reaction_id)
+        reaction.gene_reaction_rule = rules[reaction_id]
+        reactions.append(reaction)
+    model.add_reactions(reactions)
+    return model
+
+
+class ReactionDictTestCase(unittest.TestCase):
+    def setUp(self):
+        self.model = _reaction_model()
+        expression = np.array([[1., 4.], [2., 5.], [3., 6.]])
+        self.profile = ExpressionProfile(["G1", "G2", "G3"], ["T1", "T2"], expression)
+
+    def test_values(self):
+        reaction_dict = self.profile.to_reaction_dict("T1", self.model, 0.5)
+
+        # R3 has no genes; G4 and G5 are not in the profile and take the cutoff.
+        self.assertEqual(reaction_dict, {"R1": 1., "R2": 3., "R4": 0.5})
+        self.assertEqual(self.profile.to_reaction_dict(1, self.model, 0.5), {"R1": 4., "R2": 6., "R4": 0.5})
+
+    def test_cached_copy(self):
+        first = self.profile.to_reaction_dict("T1", self.model, 0.5)
+        first["R1"] = 100.
+        second = self.profile.to_reaction_dict("T1", self.model, 0.5)
+
+        self.assertEqual(len(self.profile._reaction_dict_cache), 1)
+        self.assertEqual(second["R1"], 1.)
+        self.assertIsNot(first, second)
+
+    def test_rule_change(self):
+        self.profile.to_reaction_dict("T1", self.model, 0.5)
+        self.model.reactions.R1.gene_reaction_rule = "G1 or G2"
+
+        self.assertEqual(self.profile.to_reaction_dict("T1", self.model, 0.5)["R1"], 2.)
+
+    def test_expression_change(self):
+        self.profile.to_reaction_dict("T1", self.model, 0.5)
+        self.profile.expression[0, 0] = 10.
+
+        reaction_dict = self.profile.to_reaction_dict("T1", self.model, 0.5)
+        self.assertEqual(reaction_dict["R1"], 2.)
+        self.assertEqual(reaction_dict["R4"], 0.5)
+
 
 class FluxConstraintsTestCase(unittest.TestCase):
     def test_export_import(self):
@@ -64,3 +167,13 @@ class FluxConstraintsTestCase(unittest.TestCase):
 
         self.assertEqual(flux_constraints, new_flux_constraints)
 
+
+class NormalizationTestCase(unittest.TestCase):
+    def test_or2min_and2max(self):
+        reaction = Reaction("R1")
+        reaction.gene_reaction_rule = "(G1 and G2) or G3"
+        self.assertEqual(or2min_and2max(reaction, {"G1": 1., "G2": 5., "G3": 3.}), 3.)
+        self.assertEqual(or2min_and2max(reaction, {"G1": 4., "G2": 5., "G3": 3.}), 4.)
+
+        reaction.gene_reaction_rule = "G1 and G2 or G3"
+        self.assertEqual(or2min_and2max(reaction, {"G1": 4., "G2": 5., "G3": 3.}), 4.)
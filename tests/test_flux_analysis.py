@@ -13,7 +13,11 @@
 # limitations under the License.
 import unittest
 import os
-from driven.flux_analysis.transcriptomics import gimme, imat
+
+import numpy as np
+
+from driven.flux_analysis._kernels import MISSING_ACTIVITY, activity, fold_change, inconsistency_scores
+from driven.flux_analysis.transcriptomics import gimme, gimme_iter, imat
 
 import six
 
@@ -49,6 +53,16 @@ class TranscriptomicsTestCase(unittest.TestCase):
 
         self.assertGreater(gimme_res_050.inconsistency_score, .0)
 
+    def test_gimme_iter(self):
+        model = self._blazier_model
+        conditions = self._blazier_expression.conditions
+        results = list(gimme_iter(model, self._blazier_expression, cutoff=0.5, fraction_of_optimum=0.4))
+
+        self.assertEqual(len(results), len(conditions))
+        for condition, result in zip(conditions, results):
+            expected = gimme(model, self._blazier_expression, cutoff=0.5, fraction_of_optimum=0.4, condition=condition)
+            self.assertAlmostEqual(result.objective_value, expected.objective_value)
+
     def test_imat(self):
         model = self._blazier_model
 
@@ -65,6 +79,30 @@ class TranscriptomicsTestCase(unittest.TestCase):
         # self.assertTrue(all([imat_res_050_075[r] == 0 for r in ["R1", "R2", "R3", "R4"]]))
         # self.assertTrue(all([imat_res_050_075[r] != 0 for r in ["R5", "R7", "R6", "R8"]]))
 
+    def test_imat_milp(self):
+        model = self._blazier_model
+        n_variables = len(model.variables)
+        n_constraints = len(model.constraints)
+
+        # With these cutoffs R2 is lowly and R3 highly expressed, so the binaries are added and the MILP is solved.
+        result = imat(model, self._blazier_expression, low_cutoff=0.25, high_cutoff=0.75, condition="Exp#2")
+
+        self.assertGreater(result.objective_value, 0)
+        self.assertEqual(result["R2"], 0)
+        self.assertEqual(len(model.variables), n_variables)
+        self.assertEqual(len(model.constraints), n_constraints)
+
+    def test_imat_solver(self):
+        model = self._blazier_model
+        interface = model.solver.interface
+
+        result = imat(model, self._blazier_expression, low_cutoff=0.25, high_cutoff=0.75, condition="Exp#2")
+        solver_result = imat(model, self._blazier_expression, low_cutoff=0.25, high_cutoff=0.75, condition="Exp#2",
+                             solver="glpk")
+
+        self.assertEqual(solver_result.objective_value, result.objective_value)
+        self.assertIs(model.solver.interface, interface)
+
     @unittest.skip("Not implemented")
     def test_made(self):
         raise NotImplementedError
@@ -104,6 +142,17 @@ class FluxomicsTestCase(unittest.TestCase):
 
 
 class ResultTestCase(unittest.TestCase):
-    pass
+    def test_inconsistency_scores(self):
+        fluxes = np.array([-2.0, 0.0, 3.0, 1.0])
+        expression = np.array([0.1, 0.1, np.nan, 0.9])
+        scores, total = inconsistency_scores(fluxes, expression, 0.5)
+        np.testing.assert_allclose(scores, [0.8, 0.0, 0.0, 0.0])
+        self.assertAlmostEqual(total, 0.8)
+
+    def test_activity_and_fold_change(self):
+        fluxes_a = np.array([0.0, 2.0, 0.0, -4.0])
+        fluxes_b = np.array([0.0, 0.0, 1.0, -2.0])
+        np.testing.assert_array_equal(activity(fluxes_a, fluxes_b, 1e-6), [MISSING_ACTIVITY, 1, -1, 0])
+        np.testing.assert_array_equal(fold_change(fluxes_a, fluxes_b), [np.nan, 1.0, np.nan, np.nan])
 
 
@@ -0,0 +1,71 @@
+# Copyright 2015 Novo Nordisk Foundation Center for Biosustainability, DTU.
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+
+import numpy as np
+from cobra import Model, Reaction
+
+from driven.data_sets.expression_profile import ExpressionProfile
+from driven.sensitivity_analysis.flux_analysis import expression_sensitivity_analysis
+
+
+class _Result(object):
+    def __init__(self, score):
+        self.score = score
+
+
+class ExpressionSensitivityAnalysisTestCase(unittest.TestCase):
+    def setUp(self):
+        self.model = Model("sensitivity")
+        self.model.add_reactions([Reaction(reaction_id) for reaction_id in ["EX_A", "EX_B", "R1", "GROWTH"]])
+        for reaction in self.model.reactions:
+            reaction.bounds = (-5, 5)
+
+        expression = np.array([[1., 8.], [2., 7.], [3., 6.], [4., 5.], [5., 4.], [6., 3.], [7., 2.], [8., 1.]])
+        genes = ["G%i" % i for i in range(expression.shape[0])]
+        self.profile = ExpressionProfile(genes, ["T1", "T2"], expression)
+
+    def test_bounds_and_frames(self):
+        model = self.model
+        calls = []
+
+        def method(model, expression_profile=None, condition=None, cutoff=None):
+            calls.append((condition, cutoff, {reaction.id: reaction.bounds for reaction in model.reactions}))
+            return _Result(cutoff * 2)
+
+        data_frames = expression_sensitivity_analysis(
+            method, model, self.profile, ["score"],
+            condition_exchanges={"T1": model.reactions.EX_A, "T2": model.reactions.EX_B},
+            condition_knockouts={"T2": ["R1"]},
+            growth_rates={"T1": 0.5, "T2": 0.3}, growth_rates_std={"T1": 0.1, "T2": 0.1}, growth_reaction="GROWTH")
+
+        expected = {
+            "T1": {"EX_A": (-10, 5), "EX_B": (0, 5), "R1": (-5, 5), "GROWTH": (0.4, 0.6)},
+            "T2": {"EX_A": (0, 5), "EX_B": (-10, 5), "R1": (0, 0), "GROWTH": (0.2, 0.4)},
+        }
+        self.assertEqual(set(condition for condition, _, _ in calls), {"T1", "T2"})
+        for condition, _, bounds in calls:
+            for reaction_id, (lower, upper) in expected[condition].items():
+                self.assertAlmostEqual(bounds[reaction_id][0], lower)
+                self.assertAlmostEqual(bounds[reaction_id][1], upper)
+
+        for reaction in model.reactions:
+            self.assertEqual(reaction.bounds, (-5, 5))
+
+        self.assertEqual(len(data_frames), 1)
+        data_frame = data_frames[0]
+        self.assertEqual(list(data_frame.columns), ["x", "y", "condition"])
+        self.assertEqual(data_frame["condition"].tolist(), [condition for condition, _, _ in calls])
+        self.assertEqual(data_frame["x"].tolist(), [cutoff for _, cutoff, _ in calls])
+        self.assertEqual(data_frame["y"].tolist(), [cutoff * 2 for _, cutoff, _ in calls])